@@ -3,11 +3,21 @@
 AI-powered schema extraction from marketplace specification documents.
 Uses LLM to extract structured attribute information from HTML/PDF/text.
 """
+import csv
 import json
+import re
 import sys
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Any
 
+ORJSON_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    pass
+
 # Configuration
 CONFIG = {
     "confidence_threshold": 0.85,
@@ -15,9 +25,32 @@ CONFIG = {
     "timeout": 30
 }
 
-def load_parser_config(config_path: Path) -> Dict[str, Any]:
-    """Load parser configuration from CSV."""
-    import csv
+# Whitespace-delimited tokens that mention "max" (e.g. "max50", "maxLength:30")
+_MAX_TOKEN_RE = re.compile(r'\S*max\S*', re.IGNORECASE)
+# "max 50" / "MAX50" style length constraints in plain-text specs
+_MAX_LENGTH_RE = re.compile(r'max\s*(\d+)', re.IGNORECASE)
+# Coarse per-line filters so the extractors scan the document once instead of
+# splitting it into a list and lowercasing every line
+_REQUIRED_LINE_RE = re.compile(r'^.*required.*$', re.IGNORECASE | re.MULTILINE)
+_REQUIREMENT_LINE_RE = re.compile(r'^.*(?:required|optional).*$', re.IGNORECASE | re.MULTILINE)
+
+def _write_json_file(path: Path, data: Any) -> None:
+    """Write data as 2-space indented UTF-8 JSON, serialized with orjson when available."""
+    if ORJSON_AVAILABLE:
+        try:
+            encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            # orjson rejects some values json accepts (e.g. non-str keys, >64-bit ints)
+            encoded = None
+        if encoded is not None:
+            path.write_bytes(encoded)
+            return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+@lru_cache(maxsize=4)
+def _load_parser_config_cached(config_path: str, mtime: float) -> Dict[str, Any]:
+    """Parse Parser_Config.csv; cached per (path, mtime) so edits invalidate it."""
     configs = {}
     with open(config_path, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
@@ -31,28 +64,36 @@ def load_parser_config(config_path: Path) -> Dict[str, Any]:
             }
     return configs
 
+def load_parser_config(config_path: Path) -> Dict[str, Any]:
+    """Load parser configuration from CSV.
+
+    Returns copies of the cached profiles, so callers may modify the result freely.
+    """
+    configs = _load_parser_config_cached(str(config_path), config_path.stat().st_mtime)
+    return {profile: dict(config) for profile, config in configs.items()}
+
 def extract_from_html(html_content: str, config: Dict[str, Any]) -> Dict[str, Any]:
     """Extract schema information from HTML content."""
     # Simplified HTML parsing (in production, use BeautifulSoup)
-    lines = html_content.split('\n')
-    
     # Look for table structures or attribute lists
     attributes = []
-    for line in lines:
-        line = line.strip()
-        if 'required' in line.lower() and ('true' in line.lower() or 'yes' in line.lower()):
+    for match in _REQUIRED_LINE_RE.finditer(html_content):
+        line = match.group().strip()
+        line_lower = line.lower()
+        if 'required' in line_lower and ('true' in line_lower or 'yes' in line_lower):
             # Extract attribute name and requirements
-            parts = line.split()
+            parts = line.split(maxsplit=1)
             if len(parts) >= 2:
                 attr_name = parts[0].strip(':,')
-                required = 'required' in line.lower()
+                required = True
                 max_length = None
                 
                 # Look for length constraints
-                for part in parts:
-                    if 'max' in part.lower() and any(c.isdigit() for c in part):
+                for part in _MAX_TOKEN_RE.findall(line):
+                    digits = ''.join(filter(str.isdigit, part))
+                    if digits:
                         try:
-                            max_length = int(''.join(filter(str.isdigit, part)))
+                            max_length = int(digits)
                         except:
                             pass
                 
@@ -75,11 +116,10 @@ def extract_from_text(text_content: str, config: Dict[str, Any]) -> Dict[str, An
     """Extract schema information from plain text."""
     # Simple pattern matching for common attribute patterns
     attributes = []
-    lines = text_content.split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if ':' in line and ('required' in line.lower() or 'optional' in line.lower()):
+    for match in _REQUIREMENT_LINE_RE.finditer(text_content):
+        line = match.group().strip()
+        line_lower = line.lower()
+        if ':' in line and ('required' in line_lower or 'optional' in line_lower):
             try:
                 attr_part, desc_part = line.split(':', 1)
                 attr_name = attr_part.strip()
@@ -87,11 +127,9 @@ def extract_from_text(text_content: str, config: Dict[str, Any]) -> Dict[str, An
                 
                 # Extract constraints
                 max_length = None
-                if 'max' in desc_part.lower():
-                    import re
-                    length_match = re.search(r'max\s*(\d+)', desc_part.lower())
-                    if length_match:
-                        max_length = int(length_match.group(1))
+                length_match = _MAX_LENGTH_RE.search(desc_part)
+                if length_match:
+                    max_length = int(length_match.group(1))
                 
                 attributes.append({
                     'attributeName': attr_name,
@@ -167,8 +205,7 @@ def main():
     
     # Write output
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    _write_json_file(output_file, result)
     
     print(f"Extracted {len(result['attributes'])} attributes with confidence {result['confidence']:.2f}")
 
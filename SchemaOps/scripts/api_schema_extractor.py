@@ -4,15 +4,33 @@ API-based schema extraction for marketplace integrations.
 Supports Google Merchant Center, Amazon SP-API, and Shopify Admin API.
 """
 import os
+import re
+import sys
+import gzip
 import json
+import hashlib
+import time
 import asyncio
+import urllib.parse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple, Union
 from dataclasses import dataclass
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+ORJSON_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    pass
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,9 +44,401 @@ class APIConfig:
     rate_limit: int
     headers: Dict[str, str]
 
-from googleapiclient.discovery import build
+# SchemaOps project directory (this script lives in <project>/scripts) and its config files
+PROJECT_DIR = Path(__file__).parent.parent
+CONFIG_DIR = PROJECT_DIR / "config"
+
+# On-disk cache for slow-changing upstream metadata (override with SCHEMAOPS_CACHE_DIR)
+CACHE_DIR = Path(os.environ.get("SCHEMAOPS_CACHE_DIR", Path.home() / ".cache" / "schemaops"))
+SCHEMA_VERSION_CACHE_TTL = 24 * 60 * 60  # seconds
+DEFINITION_CACHE_TTL = 24 * 60 * 60  # seconds
+
+# Per-host connection cap for the shared HTTP sessions (override with SCHEMAOPS_MAX_CONNECTIONS)
+MAX_CONNECTIONS = int(os.environ.get("SCHEMAOPS_MAX_CONNECTIONS", "20"))
+
+# Product Type Definitions API version used in request paths and cache keys
+DEFINITIONS_API_VERSION = "2020-09-01"
+
+# Version date embedded in SP-API model filenames, e.g. catalogItems_2022-04-01.json
+_SP_VERSION_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+def _read_json_cache(cache_file: Path) -> Dict[str, Any]:
+    """Read a JSON cache file, returning {} if it is missing or unreadable."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _write_json_cache(cache_file: Path, data: Dict[str, Any]) -> None:
+    """Write a JSON cache file; cache failures are logged and otherwise ignored."""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    except OSError as e:
+        logger.debug(f"Could not write cache file {cache_file}: {e}")
+
+def _json_loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON text with orjson when available, falling back to the stdlib parser."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson is stricter (e.g. NaN, >64-bit ints); let json decide
+            pass
+    return json.loads(data)
+
+# Keywords marking a Mirakl schema as product-related, in its name or anywhere in its content
+_PRODUCT_NAME_KEYWORDS_RE = re.compile('offer|product|item|catalog|service|sku')
+_PRODUCT_CONTENT_KEYWORDS_RE = re.compile('offer|product|sku|price|quantity|title|description|catalog')
+
+def _contains_keyword(obj: Any, keywords: re.Pattern) -> bool:
+    """Return True if any key or string value in a decoded JSON tree contains a keyword (case-insensitive).
+    
+    ``keywords`` is a compiled alternation of lowercase keywords, searched against each
+    lowercased string in one pass. Stops at the first match.
+    """
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if type(node) is str:
+            lowered = node.lower()
+            if keywords.search(lowered):
+                return True
+        elif type(node) is dict:
+            stack.extend(node)
+            stack.extend(node.values())
+        elif type(node) is list:
+            stack.extend(node)
+    return False
+
+def _write_json_file(path: Path, data: Any) -> None:
+    """Write data as 2-space indented UTF-8 JSON, serialized with orjson when available."""
+    if ORJSON_AVAILABLE:
+        try:
+            encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            # orjson rejects some values json accepts (e.g. >64-bit ints)
+            encoded = None
+        if encoded is not None:
+            with open(path, 'wb') as f:
+                f.write(encoded)
+            return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def _fast_json(response: requests.Response) -> Any:
+    """Decode a response body like response.json(), but through _json_loads."""
+    return _json_loads(response.content)
+
+# Schema data type for each type the JSON decoders produce (lists are handled separately)
+_JSON_TYPE_NAMES = {
+    type(None): "null",
+    bool: "boolean",
+    int: "integer",
+    float: "number",
+    str: "string",
+    dict: "object"
+}
+
+def _infer_json_type(value: Any) -> str:
+    """Infer data type from a decoded JSON value."""
+    data_type = _JSON_TYPE_NAMES.get(type(value))
+    if data_type is not None:
+        return data_type
+    if type(value) is list:
+        return "array<object>" if value and isinstance(value[0], dict) else "array"
+    return "string"
+
+def _create_session(pool_maxsize: int = MAX_CONNECTIONS, total: int = 5,
+                    backoff_factor: float = 0.5) -> requests.Session:
+    """Create a keep-alive session that retries throttled/5xx responses with backoff.
+    
+    At most pool_maxsize connections are opened per host; further concurrent requests
+    wait for a pooled connection rather than opening (and then discarding) extra ones.
+    total and backoff_factor let each client pick its own retry budget.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=total,
+        connect=0,  # Only the status codes below are retried; DNS/connection failures
+        read=0,     # and read timeouts fail fast instead of stalling through backoff
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        raise_on_status=False  # Hand the final response back so callers can log the status
+    )
+    adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize,
+                          max_retries=retries, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class TokenBucket:
+    """Thread-safe token bucket for pacing requests against a per-second quota.
+    
+    The rate starts at the documented quota and follows the x-amzn-RateLimit-Limit
+    header once responses report it. Retrying individual 429s is left to the
+    session's urllib3 Retry, which honours Retry-After.
+    """
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate  # tokens (requests) per second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Reserve a token, sleeping until it becomes available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+    
+    def update_from_response(self, response: requests.Response) -> None:
+        """Adapt to the quota SP-API reports and back off all callers after a 429."""
+        try:
+            reported_rate = float(response.headers.get('x-amzn-RateLimit-Limit', 0))
+        except ValueError:
+            reported_rate = 0
+        try:
+            retry_after = float(response.headers.get('Retry-After', 0))
+        except ValueError:
+            retry_after = 0
+        with self._lock:
+            if reported_rate > 0:
+                self.rate = reported_rate
+            if response.status_code == 429:
+                # Push the next reservation out by Retry-After (or one interval)
+                self._tokens = min(self._tokens, 0) - max(retry_after * self.rate, 1)
+
+class DefinitionCache:
+    """Gzipped on-disk cache of product type definitions keyed by (productType, marketplaceId, version)."""
+    
+    def __init__(self, cache_dir: Path, ttl: float = DEFINITION_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+    
+    def _path(self, product_type: str, marketplace_id: str, version: str) -> Path:
+        key = hashlib.sha256(f"{product_type}|{marketplace_id}|{version}".encode('utf-8')).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}.json.gz"
+    
+    def load(self, product_type: str, marketplace_id: str, version: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry ({"data", "linkedSchema", "lastModified", ...}) regardless of age."""
+        try:
+            with gzip.open(self._path(product_type, marketplace_id, version), 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry if isinstance(entry, dict) and 'data' in entry else None
+        except (OSError, EOFError, ValueError):
+            return None
+    
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get('fetchedAt', 0) < self.ttl
+    
+    def get(self, product_type: str, marketplace_id: str, version: str) -> Optional[Any]:
+        """Return the cached definition if it is younger than the TTL, else None."""
+        entry = self.load(product_type, marketplace_id, version)
+        return entry['data'] if entry and self.is_fresh(entry) else None
+    
+    def put(self, product_type: str, marketplace_id: str, version: str, data: Any,
+            last_modified: Optional[str] = None, product_type_version: Any = None,
+            linked_schema: Any = None) -> None:
+        cache_file = self._path(product_type, marketplace_id, version)
+        entry = {
+            "data": data,
+            "linkedSchema": linked_schema,
+            "lastModified": last_modified,
+            "productTypeVersion": product_type_version,
+            "fetchedAt": time.time()
+        }
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(cache_file, 'wt', encoding='utf-8', compresslevel=3) as f:
+                json.dump(entry, f, ensure_ascii=False)
+        except OSError as e:
+            logger.debug(f"Could not write cache file {cache_file}: {e}")
+
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2 import service_account
 
+# Product Type Definitions response parsers. Each yields new attribute dicts and
+# records their names in `seen` as it goes, so de-duplication also applies within
+# a parser and the caller can simply extend its attribute list. Inputs always come
+# from JSON decoding, so exact type checks stand in for isinstance().
+def _intern(value: Any) -> Any:
+    """Intern a str so repeated enum-like values (types, groups) share one object; pass anything else through."""
+    return sys.intern(value) if type(value) is str else value
+
+def _make_attr(product_type: str, name: str, required: Any = False, data_type: Any = 'string',
+               description: Any = '', requirement_type: Optional[str] = None,
+               property_group: Optional[str] = None, source: Optional[str] = None) -> Dict[str, Any]:
+    """Build a product type attribute dict; optional keys are only present when given.
+    
+    dataType, requirementType and propertyGroup repeat across every definition, so they
+    are interned rather than kept as one decoded copy per attribute.
+    """
+    attr = {
+        "name": f"{product_type}.{name}",
+        "required": required,
+        "dataType": _intern(data_type),
+        "description": description,
+        "productType": product_type
+    }
+    if requirement_type is not None:
+        attr["requirementType"] = _intern(requirement_type)
+    if property_group is not None:
+        attr["propertyGroup"] = _intern(property_group)
+    if source is not None:
+        attr["source"] = source
+    return attr
+
+def _record(seen: set, attr: Dict[str, Any]) -> Dict[str, Any]:
+    """Mark an attribute's last name segment as seen and return the attribute."""
+    seen.add(attr['name'].split('.')[-1])
+    return attr
+
+def _parse_requirements(def_data: Dict[str, Any], product_type_name: str, seen: set) -> Iterator[Dict[str, Any]]:
+    requirements = def_data.get('requirements', {})
+    if type(requirements) is dict:
+        for req_type, req_list in requirements.items():
+            if type(req_list) is not list:
+                continue
+            for req_item in req_list:
+                if type(req_item) is dict and req_item.get('name', ''):
+                    yield _record(seen, _make_attr(
+                        product_type_name, req_item['name'],
+                        required=req_type == 'REQUIRED',
+                        data_type=req_item.get('valueType', 'string'),
+                        description=req_item.get('description', ''),
+                        requirement_type=req_type))
+    elif type(requirements) is list:
+        # Sometimes requirements is a list
+        for req_item in requirements:
+            if type(req_item) is dict and req_item.get('name', ''):
+                yield _record(seen, _make_attr(
+                    product_type_name, req_item['name'],
+                    required=req_item.get('required', False),
+                    data_type=req_item.get('valueType', req_item.get('type', 'string')),
+                    description=req_item.get('description', '')))
+
+def _parse_schema_properties(schema: Dict[str, Any], product_type_name: str, seen: set,
+                             source: str) -> Iterator[Dict[str, Any]]:
+    """Yield attributes for a JSON-schema style {"properties": ..., "required": [...]} dict."""
+    for prop_name, prop_def in schema['properties'].items():
+        if prop_name not in seen:
+            yield _record(seen, _make_attr(
+                product_type_name, prop_name,
+                required=prop_name in schema.get('required', []),
+                data_type=prop_def.get('type', 'string'),
+                description=prop_def.get('description', ''),
+                source=source))
+
+def _parse_schema_field(def_data: Dict[str, Any], product_type_name: str, seen: set) -> Iterator[Dict[str, Any]]:
+    schema_data = def_data.get('schema')
+    if type(schema_data) is dict:
+        if 'properties' in schema_data:
+            yield from _parse_schema_properties(schema_data, product_type_name, seen,
+                                                "product_type_definition_schema")
+    elif type(schema_data) is str:
+        # Schema might be a JSON string
+        try:
+            schema_dict = _json_loads(schema_data)
+            if type(schema_dict) is dict and 'properties' in schema_dict:
+                yield from _parse_schema_properties(schema_dict, product_type_name, seen,
+                                                    "product_type_definition_schema_json")
+        except:
+            pass
+
+def _parse_requirements_list(def_data: Dict[str, Any], product_type_name: str, seen: set) -> Iterator[Dict[str, Any]]:
+    req_list = def_data.get('requirementsList')
+    if type(req_list) is not list:
+        return
+    for req_item in req_list:
+        if type(req_item) is not dict:
+            continue
+        attribute_name = req_item.get('name', req_item.get('attribute', ''))
+        if attribute_name:
+            yield _record(seen, _make_attr(
+                product_type_name, attribute_name,
+                required=req_item.get('isRequired', req_item.get('required', False)),
+                data_type=req_item.get('valueType', req_item.get('type', 'string')),
+                description=req_item.get('description', ''),
+                source="requirementsList"))
+
+def _normalize_property_groups(property_groups: Any) -> List[Tuple[str, Dict[str, Any]]]:
+    """Return (group_name, group_data) pairs for either the dict or the list form of propertyGroups."""
+    if type(property_groups) is dict:
+        return [(name, group) for name, group in property_groups.items() if type(group) is dict]
+    if type(property_groups) is list:
+        return [(group.get('name', ''), group) for group in property_groups if type(group) is dict]
+    return []
+
+def _parse_property_groups(def_data: Dict[str, Any], product_type_name: str, seen: set) -> Iterator[Dict[str, Any]]:
+    for group_name, group_data in _normalize_property_groups(def_data.get('propertyGroups')):
+        description = group_data.get('description', group_data.get('title', ''))
+        # propertyGroups can contain propertyNames (list of strings)
+        property_names = group_data.get('propertyNames', [])
+        if type(property_names) is list:
+            for prop_name in property_names:
+                if type(prop_name) is str and prop_name not in seen:
+                    # required needs checking against requirements separately; dataType may need inferring
+                    yield _record(seen, _make_attr(
+                        product_type_name, prop_name,
+                        description=description,
+                        property_group=group_name,
+                        source="propertyGroups"))
+        
+        # Also check for other structures
+        properties = group_data.get('properties', group_data.get('attributes', []))
+        if type(properties) is list:
+            for prop in properties:
+                if type(prop) is not dict:
+                    continue
+                prop_name = prop.get('name', prop.get('key', ''))
+                if prop_name and prop_name not in seen:
+                    yield _record(seen, _make_attr(
+                        product_type_name, prop_name,
+                        required=prop.get('isRequired', prop.get('required', False)),
+                        data_type=prop.get('valueType', prop.get('type', 'string')),
+                        description=prop.get('description', ''),
+                        property_group=group_name,
+                        source="propertyGroups"))
+        elif type(properties) is dict:
+            for prop_name, prop_def in properties.items():
+                if prop_name not in seen:
+                    if type(prop_def) is not dict:
+                        prop_def = {}
+                    yield _record(seen, _make_attr(
+                        product_type_name, prop_name,
+                        required=prop_def.get('required', False),
+                        data_type=prop_def.get('type', 'string'),
+                        description=prop_def.get('description', ''),
+                        property_group=group_name,
+                        source="propertyGroups"))
+
+def _parse_linked_schema(linked_schema: Any, product_type_name: str, seen: set) -> Iterator[Dict[str, Any]]:
+    """Yield properties of the schema fetched from a definition's schema.link."""
+    if type(linked_schema) is not dict or 'properties' not in linked_schema:
+        return
+    try:
+        yield from _parse_schema_properties(linked_schema, product_type_name, seen, "fetched_schema")
+    except Exception as e:
+        logger.debug("Could not parse linked schema: %s", e)
+
+DEFINITION_PARSERS = [
+    ("requirements", _parse_requirements),
+    ("schema", _parse_schema_field),
+    ("requirementsList", _parse_requirements_list),
+    ("propertyGroups", _parse_property_groups),
+]
+
 class GoogleMerchantCenterAPI:
     """Google Merchant Center Content API client."""
     
@@ -42,17 +452,32 @@ class GoogleMerchantCenterAPI:
             rate_limit=10000,  # per day
             headers={"Content-Type": "application/json"}
         )
+        self._gauth_session: Optional[AuthorizedSession] = None
     
-    def get_product_schema(self, merchant_id: str) -> Dict[str, Any]:
-        """Get product data specification schema."""
-        try:
+    def _get_session(self) -> AuthorizedSession:
+        """Return an authorized session, loading the service account credentials once.
+        
+        Content API calls go straight to the REST endpoints; building a discovery
+        client would fetch and reflect the whole API document for three requests.
+        """
+        if self._gauth_session is None:
             creds = service_account.Credentials.from_service_account_file(
                 self.credentials_path, scopes=['https://www.googleapis.com/auth/content'])
-            service = build('content', 'v2.1', credentials=creds)
+            session = AuthorizedSession(creds)
+            session.mount("https://", HTTPAdapter(pool_maxsize=8))
+            self._gauth_session = session
+        return self._gauth_session
+    
+    def get_product_schema(self, merchant_id: str, extracted_at: Optional[str] = None) -> Dict[str, Any]:
+        """Get product data specification schema."""
+        try:
+            session = self._get_session()
+            products_url = f"{self.base_url}/{merchant_id}/products"
 
             # List products to find a valid product ID
-            request = service.products().list(merchantId=merchant_id, maxResults=1)
-            response = request.execute()
+            list_response = session.get(products_url, params={'maxResults': 1})
+            list_response.raise_for_status()
+            response = _fast_json(list_response)
 
             if 'resources' not in response or len(response['resources']) == 0:
                 # If no products are found, insert a sample product.
@@ -74,26 +499,29 @@ class GoogleMerchantCenterAPI:
                         'currency': 'USD'
                     }
                 }
-                product_insert_request = service.products().insert(merchantId=merchant_id, body=sample_product)
-                inserted_product = product_insert_request.execute()
-                product_id = inserted_product['id']
+                insert_response = session.post(products_url, json=sample_product)
+                insert_response.raise_for_status()
+                product_id = _fast_json(insert_response)['id']
             else:
                 product_id = response['resources'][0]['id']
             
-            product_request = service.products().get(merchantId=merchant_id, productId=product_id)
-            product = product_request.execute()
+            # Product IDs look like "online:en:US:offer-id"; encode the colons as the client library did
+            product_response = session.get(f"{products_url}/{urllib.parse.quote(product_id, safe='')}")
+            product_response.raise_for_status()
+            product = _fast_json(product_response)
 
-            attributes = []
-            for key, value in product.items():
-                attributes.append({
+            attributes = [
+                {
                     "name": key,
                     "required": False,  # This is an assumption
-                    "dataType": str(type(value).__name__),
+                    "dataType": type(value).__name__,
                     "description": ""
-                })
+                }
+                for key, value in product.items()
+            ]
             schema = {
                 "attributes": attributes,
-                "extractedAt": datetime.now().isoformat(),
+                "extractedAt": extracted_at or datetime.now().isoformat(),
                 "source": "google_merchant_center_api",
                 "version": "v2.1"
             }
@@ -118,6 +546,19 @@ class AmazonSPAPI:
         self.client_secret = client_secret
         self.refresh_token = refresh_token
         self.iam_user_arn = iam_user_arn
+        # Shared across token, GitHub and SP-API calls so connections are reused
+        self.session = _create_session()
+        # Product Type Definitions API documents 2 requests per second; the bucket
+        # follows x-amzn-RateLimit-Limit once responses report the real quota
+        self.definitions_rate_limiter = TokenBucket(rate=2.0)
+        # searchCatalogItems: 2 requests per second with a burst of 2
+        self.catalog_rate_limiter = TokenBucket(rate=2.0, capacity=2.0)
+        self.max_workers = 8
+        self.definition_cache = DefinitionCache(CACHE_DIR / "sp_defs")
+        # LWA access tokens are valid for an hour; reuse one until shortly before expiry
+        self._token: Optional[str] = None
+        self._token_expiry = 0.0
+        self._token_lock = threading.Lock()
         self.config = APIConfig(
             name="amazon_sp_api",
             base_url=self.base_url,
@@ -127,11 +568,18 @@ class AmazonSPAPI:
         )
     
     def _get_access_token(self) -> Optional[str]:
-        """Get access token using refresh token."""
+        """Get access token using refresh token, reusing the cached token while it has >60s left."""
         if not all([self.client_id, self.client_secret, self.refresh_token]):
             logger.warning("Amazon SP-API credentials not provided, cannot get access token")
             return None
         
+        with self._token_lock:
+            if self._token and time.monotonic() < self._token_expiry - 60:
+                return self._token
+            return self._refresh_access_token()
+    
+    def _refresh_access_token(self) -> Optional[str]:
+        """Request a new access token from LWA and cache it with its expiry."""
         try:
             url = 'https://api.amazon.com/auth/o2/token'
             headers = {'Content-Type': 'application/x-www-form-urlencoded'}
@@ -142,51 +590,161 @@ class AmazonSPAPI:
                 'client_secret': self.client_secret
             }
             
-            response = requests.post(url, headers=headers, data=data)
+            response = self.session.post(url, headers=headers, data=data)
             response.raise_for_status()
             
-            access_token = response.json()['access_token']
+            token_data = _fast_json(response)
+            self._token = token_data['access_token']
+            self._token_expiry = time.monotonic() + token_data.get('expires_in', 3600)
             logger.info("Successfully obtained Amazon SP-API access token")
-            return access_token
+            return self._token
         except Exception as e:
             logger.error(f"Error getting Amazon SP-API access token: {e}")
             return None
     
     def _get_latest_schema_version(self) -> str:
-        """Get the latest available schema version from GitHub repository."""
+        """Get the latest available schema version from GitHub repository.
+        
+        The result is cached on disk for SCHEMA_VERSION_CACHE_TTL seconds and then
+        revalidated with the listing's ETag, so most runs make no GitHub request.
+        """
+        cache_file = CACHE_DIR / "amzn_sp_version.json"
+        cached = _read_json_cache(cache_file)
+        cached_version = cached.get('version')
+        if cached_version and time.time() - cached.get('fetched_at', 0) < SCHEMA_VERSION_CACHE_TTL:
+            logger.info(f"Using cached Amazon SP-API schema version: {cached_version}")
+            return cached_version
+        
         try:
-            import re
             api_url = f"https://api.github.com/repos/{self.repo_path}/contents/{self.model_path}"
-            response = requests.get(api_url)
+            request_headers = {}
+            if cached_version and cached.get('etag'):
+                request_headers['If-None-Match'] = cached['etag']
+            response = self.session.get(api_url, headers=request_headers)
+            if response.status_code == 304:
+                logger.info(f"Amazon SP-API schema listing unchanged, using cached version: {cached_version}")
+                cached['fetched_at'] = time.time()
+                _write_json_cache(cache_file, cached)
+                return cached_version
             response.raise_for_status()
             
-            files = response.json()
-            versions = []
-            for file in files:
-                if file.get('type') == 'file' and 'catalogItems_' in file.get('name', ''):
-                    # Extract version from filename like catalogItems_2022-04-01.json
-                    match = re.search(r'(\d{4}-\d{2}-\d{2})', file['name'])
-                    if match:
-                        versions.append(match.group(1))
+            # Only the file names matter, so skip everything else in each entry
+            names = (file.get('name', '') for file in _json_loads(response.content)
+                     if file.get('type') == 'file')
+            # Extract version from filename like catalogItems_2022-04-01.json
+            versions = [match.group(1) for name in names
+                        if 'catalogItems_' in name and (match := _SP_VERSION_RE.search(name))]
             
             if versions:
-                # Sort versions in descending order (newest first)
-                versions.sort(reverse=True)
-                latest_version = versions[0]
+                # ISO dates compare lexicographically, so max() is the newest
+                latest_version = max(versions)
                 logger.info(f"Found latest Amazon SP-API schema version: {latest_version}")
+                _write_json_cache(cache_file, {
+                    "version": latest_version,
+                    "etag": response.headers.get('ETag'),
+                    "fetched_at": time.time()
+                })
                 return latest_version
             else:
                 logger.warning("No schema versions found, falling back to 2022-04-01")
                 return "2022-04-01"
         except Exception as e:
+            if cached_version:
+                logger.warning(f"Error getting latest schema version: {e}, using stale cached version {cached_version}")
+                return cached_version
             logger.warning(f"Error getting latest schema version: {e}, falling back to 2022-04-01")
             return "2022-04-01"
     
-    def _get_schema_from_api(self, marketplace_id: str, access_token: str) -> Dict[str, Any]:
+    def _fetch_linked_schema(self, def_data: Any, headers: Dict[str, str]) -> Any:
+        """Fetch the schema referenced by a definition's schema.link, or None if there is none."""
+        if type(def_data) is not dict:
+            return None
+        schema_link_info = def_data.get('schema', {})
+        if not (type(schema_link_info) is dict and 'link' in schema_link_info):
+            return None
+        link_info = schema_link_info.get('link', {})
+        if not (type(link_info) is dict and 'resource' in link_info):
+            return None
+        try:
+            schema_response = self.session.get(link_info['resource'], headers=headers)
+            if schema_response.status_code == 200:
+                return _fast_json(schema_response)
+        except Exception as e:
+            logger.debug("Could not fetch schema from link: %s", e)
+        return None
+    
+    def _fetch_product_type_definitions(self, api_base_url: str, product_types: List[Dict[str, Any]],
+                                        marketplace_id: str, headers: Dict[str, str]):
+        """Fetch product type definitions concurrently, paced by the definitions rate limiter.
+        
+        Yields (product_type_name, (definition, linked_schema)) pairs in listing order; a
+        fetch that failed yields the exception instead. Each worker also fetches the schema
+        the definition links to, so those downloads overlap as well. Production definitions
+        are served from the on-disk cache while fresh or while the listing reports the same
+        productTypeVersion, and revalidated with If-Modified-Since after that.
+        """
+        use_cache = api_base_url == self.base_url
+        
+        def fetch(product_type: Dict[str, Any]) -> Tuple[Any, Any]:
+            product_type_name = product_type['name']
+            listed_version = product_type.get('productTypeVersion')
+            cached = None
+            if use_cache:
+                cached = self.definition_cache.load(product_type_name, marketplace_id, DEFINITIONS_API_VERSION)
+                if cached and (self.definition_cache.is_fresh(cached) or
+                               (listed_version is not None and cached.get('productTypeVersion') == listed_version)):
+                    if 'linkedSchema' in cached:
+                        return cached['data'], cached['linkedSchema']
+                    return cached['data'], self._fetch_linked_schema(cached['data'], headers)
+            
+            def_url = f"{api_base_url}/definitions/{DEFINITIONS_API_VERSION}/productTypes/{product_type_name}"
+            def_params = {'marketplaceIds': marketplace_id, 'sellerId': product_type.get('sellerId', '')}
+            request_headers = headers
+            if cached and cached.get('lastModified'):
+                request_headers = {**headers, 'If-Modified-Since': cached['lastModified']}
+            self.definitions_rate_limiter.acquire()
+            response = self.session.get(def_url, headers=request_headers, params=def_params)
+            self.definitions_rate_limiter.update_from_response(response)
+            
+            if response.status_code == 304 and cached:
+                def_data = cached['data']
+                # The cached definition's link may have expired; reuse the schema stored with it
+                if 'linkedSchema' in cached:
+                    linked_schema = cached['linkedSchema']
+                else:
+                    linked_schema = self._fetch_linked_schema(def_data, headers)
+            else:
+                response.raise_for_status()
+                def_data = _fast_json(response)
+                # Linked schema URLs can expire, so keep the fetched schema with the definition
+                linked_schema = self._fetch_linked_schema(def_data, headers)
+            if use_cache:
+                self.definition_cache.put(product_type_name, marketplace_id, DEFINITIONS_API_VERSION, def_data,
+                                          response.headers.get('Last-Modified') or (cached or {}).get('lastModified'),
+                                          listed_version, linked_schema)
+            return def_data, linked_schema
+        
+        named_types = [product_type for product_type in product_types if product_type.get('name', '')]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(fetch, product_type) for product_type in named_types]
+            for product_type, future in zip(named_types, futures):
+                try:
+                    yield product_type['name'], future.result()
+                except Exception as e:
+                    yield product_type['name'], e
+    
+    def _get_schema_from_api(self, marketplace_id: str, access_token: str,
+                             extracted_at: Optional[str] = None) -> Dict[str, Any]:
         """Get product schema from actual Amazon SP-API using Product Type Definitions and Catalog Items APIs."""
         attributes = []
+        # Last dotted segment of every collected attribute name, used for de-duplication
+        seen_names = set()
         version = datetime.now().strftime("%Y-%m-%d")
         
+        def add_attribute(attr: Dict[str, Any]) -> None:
+            attributes.append(attr)
+            seen_names.add(attr['name'].split('.')[-1])
+        
         try:
             # Method 1: Get Product Type Definitions
             # This gives us the canonical schema definitions
@@ -195,7 +753,7 @@ class AmazonSPAPI:
             
             for api_base_url in api_base_urls:
                 try:
-                    product_types_url = f"{api_base_url}/definitions/2020-09-01/productTypes"
+                    product_types_url = f"{api_base_url}/definitions/{DEFINITIONS_API_VERSION}/productTypes"
                     headers = {
                         'x-amz-access-token': access_token,
                         'Content-Type': 'application/json'
@@ -206,253 +764,61 @@ class AmazonSPAPI:
                     
                     env_name = "sandbox" if api_base_url == self.sandbox_url else "production"
                     logger.info(f"Fetching product types from Product Type Definitions API ({env_name})...")
-                    response = requests.get(product_types_url, headers=headers, params=params)
+                    # Same API as the definitions, so it draws from the same bucket; its own
+                    # quota header isn't fed back since it describes a different operation
+                    self.definitions_rate_limiter.acquire()
+                    response = self.session.get(product_types_url, headers=headers, params=params)
                     
                     if response.status_code == 200:
-                        product_types_data = response.json()
+                        product_types_data = _fast_json(response)
                         product_types = product_types_data.get('productTypes', [])
                         logger.info(f"Found {len(product_types)} product types")
                         
-                        # Get schema for all product types with rate limiting
-                        # API allows 2 requests per second, so we'll use 0.6s delay between requests
-                        import time
+                        # Get schema for all product types; definitions are fetched concurrently
+                        # (paced by the adaptive rate limiter) and parsed here in listing order
                         processed_count = 0
                         total_types = len(product_types)
                         
                         logger.info(f"Processing all {total_types} product types...")
-                        for product_type in product_types:
-                            product_type_name = product_type.get('name', '')
-                            if not product_type_name:
+                        definitions = self._fetch_product_type_definitions(
+                            api_base_url, product_types, marketplace_id, headers)
+                        for product_type_name, definition in definitions:
+                            # Throttling and 5xx are already retried by the session; anything
+                            # still failing here is skipped rather than parsed
+                            if isinstance(definition, Exception):
+                                logger.warning("Error getting definition for %s: %s", product_type_name, definition)
                                 continue
+                            def_data, linked_schema = definition
                             
                             try:
-                                # Get product type definition
-                                # Use the same base URL that worked
-                                def_url = f"{api_base_url}/definitions/2020-09-01/productTypes/{product_type_name}"
-                                def_params = {'marketplaceIds': marketplace_id, 'sellerId': product_type.get('sellerId', '')}
+                                logger.debug("Product type definition response keys: %s", def_data.keys())
                                 
-                                def_response = requests.get(def_url, headers=headers, params=def_params)
-                                if def_response.status_code == 200:
-                                    def_data = def_response.json()
-                                    logger.debug(f"Product type definition response keys: {list(def_data.keys())}")
-                                    
-                                    # Extract attributes from product type definition
-                                    # Product Type Definitions API response structure may vary
-                                    requirements = def_data.get('requirements', {})
-                                    
-                                    if isinstance(requirements, dict):
-                                        for req_type, req_list in requirements.items():
-                                            if isinstance(req_list, list):
-                                                for req_item in req_list:
-                                                    if isinstance(req_item, dict):
-                                                        attribute_name = req_item.get('name', '')
-                                                        if attribute_name:
-                                                            attributes.append({
-                                                                "name": f"{product_type_name}.{attribute_name}",
-                                                                "required": req_type == 'REQUIRED',
-                                                                "dataType": req_item.get('valueType', 'string'),
-                                                                "description": req_item.get('description', ''),
-                                                                "productType": product_type_name,
-                                                                "requirementType": req_type
-                                                            })
-                                    elif isinstance(requirements, list):
-                                        # Sometimes requirements is a list
-                                        for req_item in requirements:
-                                            if isinstance(req_item, dict):
-                                                attribute_name = req_item.get('name', '')
-                                                if attribute_name:
-                                                    attributes.append({
-                                                        "name": f"{product_type_name}.{attribute_name}",
-                                                        "required": req_item.get('required', False),
-                                                        "dataType": req_item.get('valueType', req_item.get('type', 'string')),
-                                                        "description": req_item.get('description', ''),
-                                                        "productType": product_type_name
-                                                    })
-                                    
-                                    # Also try to extract from schema field if present
-                                    if 'schema' in def_data:
-                                        schema_data = def_data['schema']
-                                        if isinstance(schema_data, dict):
-                                            if 'properties' in schema_data:
-                                                for prop_name, prop_def in schema_data['properties'].items():
-                                                    existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                                    if prop_name not in existing_names:
-                                                        attributes.append({
-                                                            "name": f"{product_type_name}.{prop_name}",
-                                                            "required": prop_name in schema_data.get('required', []),
-                                                            "dataType": prop_def.get('type', 'string'),
-                                                            "description": prop_def.get('description', ''),
-                                                            "productType": product_type_name,
-                                                            "source": "product_type_definition_schema"
-                                                        })
-                                        elif isinstance(schema_data, str):
-                                            # Schema might be a JSON string
-                                            try:
-                                                import json
-                                                schema_dict = json.loads(schema_data)
-                                                if isinstance(schema_dict, dict) and 'properties' in schema_dict:
-                                                    for prop_name, prop_def in schema_dict['properties'].items():
-                                                        existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                                        if prop_name not in existing_names:
-                                                            attributes.append({
-                                                                "name": f"{product_type_name}.{prop_name}",
-                                                                "required": prop_name in schema_dict.get('required', []),
-                                                                "dataType": prop_def.get('type', 'string'),
-                                                                "description": prop_def.get('description', ''),
-                                                                "productType": product_type_name,
-                                                                "source": "product_type_definition_schema_json"
-                                                            })
-                                            except:
-                                                pass
-                                    
-                                    # Try to extract from requirementsList if present
-                                    if 'requirementsList' in def_data:
-                                        req_list = def_data['requirementsList']
-                                        if isinstance(req_list, list):
-                                            for req_item in req_list:
-                                                if isinstance(req_item, dict):
-                                                    attribute_name = req_item.get('name', req_item.get('attribute', ''))
-                                                    if attribute_name:
-                                                        attributes.append({
-                                                            "name": f"{product_type_name}.{attribute_name}",
-                                                            "required": req_item.get('isRequired', req_item.get('required', False)),
-                                                            "dataType": req_item.get('valueType', req_item.get('type', 'string')),
-                                                            "description": req_item.get('description', ''),
-                                                            "productType": product_type_name,
-                                                            "source": "requirementsList"
-                                                        })
-                                    
-                                    # Extract from propertyGroups if present
-                                    property_groups = def_data.get('propertyGroups', {})
-                                    if isinstance(property_groups, dict):
-                                        for group_name, group_data in property_groups.items():
-                                            if isinstance(group_data, dict):
-                                                # propertyGroups can contain propertyNames (list of strings)
-                                                property_names = group_data.get('propertyNames', [])
-                                                if isinstance(property_names, list):
-                                                    for prop_name in property_names:
-                                                        if isinstance(prop_name, str):
-                                                            existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                                            if prop_name not in existing_names:
-                                                                attributes.append({
-                                                                    "name": f"{product_type_name}.{prop_name}",
-                                                                    "required": False,  # Will need to check requirements separately
-                                                                    "dataType": "string",  # Default, may need to infer
-                                                                    "description": group_data.get('description', group_data.get('title', '')),
-                                                                    "productType": product_type_name,
-                                                                    "propertyGroup": group_name,
-                                                                    "source": "propertyGroups"
-                                                                })
-                                                
-                                                # Also check for other structures
-                                                properties = group_data.get('properties', group_data.get('attributes', []))
-                                                if isinstance(properties, list):
-                                                    for prop in properties:
-                                                        if isinstance(prop, dict):
-                                                            prop_name = prop.get('name', prop.get('key', ''))
-                                                            if prop_name:
-                                                                existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                                                if prop_name not in existing_names:
-                                                                    attributes.append({
-                                                                        "name": f"{product_type_name}.{prop_name}",
-                                                                        "required": prop.get('isRequired', prop.get('required', False)),
-                                                                        "dataType": prop.get('valueType', prop.get('type', 'string')),
-                                                                        "description": prop.get('description', ''),
-                                                                        "productType": product_type_name,
-                                                                        "propertyGroup": group_name,
-                                                                        "source": "propertyGroups"
-                                                                    })
-                                                elif isinstance(properties, dict):
-                                                    for prop_name, prop_def in properties.items():
-                                                        existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                                        if prop_name not in existing_names:
-                                                            attributes.append({
-                                                                "name": f"{product_type_name}.{prop_name}",
-                                                                "required": prop_def.get('required', False) if isinstance(prop_def, dict) else False,
-                                                                "dataType": prop_def.get('type', 'string') if isinstance(prop_def, dict) else 'string',
-                                                                "description": prop_def.get('description', '') if isinstance(prop_def, dict) else '',
-                                                                "productType": product_type_name,
-                                                                "propertyGroup": group_name,
-                                                                "source": "propertyGroups"
-                                                            })
-                                    elif isinstance(property_groups, list):
-                                        for group in property_groups:
-                                            if isinstance(group, dict):
-                                                group_name = group.get('name', '')
-                                                property_names = group.get('propertyNames', [])
-                                                if isinstance(property_names, list):
-                                                    for prop_name in property_names:
-                                                        if isinstance(prop_name, str):
-                                                            existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                                            if prop_name not in existing_names:
-                                                                attributes.append({
-                                                                    "name": f"{product_type_name}.{prop_name}",
-                                                                    "required": False,
-                                                                    "dataType": "string",
-                                                                    "description": group.get('description', ''),
-                                                                    "productType": product_type_name,
-                                                                    "propertyGroup": group_name,
-                                                                    "source": "propertyGroups"
-                                                                })
-                                                properties = group.get('properties', group.get('attributes', []))
-                                                if isinstance(properties, list):
-                                                    for prop in properties:
-                                                        if isinstance(prop, dict):
-                                                            prop_name = prop.get('name', prop.get('key', ''))
-                                                            if prop_name:
-                                                                existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                                                if prop_name not in existing_names:
-                                                                    attributes.append({
-                                                                        "name": f"{product_type_name}.{prop_name}",
-                                                                        "required": prop.get('isRequired', prop.get('required', False)),
-                                                                        "dataType": prop.get('valueType', prop.get('type', 'string')),
-                                                                        "description": prop.get('description', ''),
-                                                                        "productType": product_type_name,
-                                                                        "propertyGroup": group_name,
-                                                                        "source": "propertyGroups"
-                                                                    })
-                                    
-                                    # Try to fetch schema from link if it's a dict with resource
-                                    schema_link_info = def_data.get('schema', {})
-                                    if isinstance(schema_link_info, dict) and 'link' in schema_link_info:
-                                        link_info = schema_link_info.get('link', {})
-                                        if isinstance(link_info, dict) and 'resource' in link_info:
-                                            schema_url = link_info['resource']
-                                            try:
-                                                schema_response = requests.get(schema_url, headers=headers)
-                                                if schema_response.status_code == 200:
-                                                    fetched_schema = schema_response.json()
-                                                    if isinstance(fetched_schema, dict) and 'properties' in fetched_schema:
-                                                        for prop_name, prop_def in fetched_schema['properties'].items():
-                                                            existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                                            if prop_name not in existing_names:
-                                                                attributes.append({
-                                                                    "name": f"{product_type_name}.{prop_name}",
-                                                                    "required": prop_name in fetched_schema.get('required', []),
-                                                                    "dataType": prop_def.get('type', 'string'),
-                                                                    "description": prop_def.get('description', ''),
-                                                                    "productType": product_type_name,
-                                                                    "source": "fetched_schema"
-                                                                })
-                                            except Exception as e:
-                                                logger.debug(f"Could not fetch schema from link: {e}")
-                                    
-                                    # Log if we extracted any attributes from this product type
-                                    type_attrs = [attr for attr in attributes if attr.get('productType') == product_type_name]
-                                    if type_attrs:
-                                        logger.info(f"Extracted {len(type_attrs)} attributes from product type {product_type_name}")
-                                    else:
-                                        logger.warning(f"No attributes extracted from product type {product_type_name}, response structure: {list(def_data.keys())}")
+                                attribute_count = len(attributes)
+                                
+                                # Extract attributes from product type definition; the
+                                # response structure varies, so try each known layout in turn
+                                for _, parse in DEFINITION_PARSERS:
+                                    attributes.extend(parse(def_data, product_type_name, seen_names))
+                                
+                                # Add properties from the schema the definition links to, if any
+                                attributes.extend(_parse_linked_schema(linked_schema, product_type_name, seen_names))
+                                
+                                # Log if we extracted any attributes from this product type
+                                type_attr_count = len(attributes) - attribute_count
+                                if type_attr_count:
+                                    logger.info("Extracted %d attributes from product type %s", type_attr_count, product_type_name)
+                                else:
+                                    logger.warning("No attributes extracted from product type %s, response structure: %s",
+                                                   product_type_name, list(def_data.keys()))
                             except Exception as e:
-                                logger.warning(f"Error getting definition for {product_type_name}: {e}")
+                                logger.warning("Error parsing definition for %s: %s", product_type_name, e)
                                 continue
                             
                             processed_count += 1
-                            # Rate limiting: wait 0.6 seconds between requests (API allows 2 req/sec)
                             if processed_count < total_types:
-                                time.sleep(0.6)
                                 if processed_count % 10 == 0:
-                                    logger.info(f"Processed {processed_count}/{total_types} product types, extracted {len(attributes)} attributes so far...")
+                                    logger.info("Processed %d/%d product types, extracted %d attributes so far...",
+                                                processed_count, total_types, len(attributes))
                         
                         logger.info(f"Completed processing {processed_count}/{total_types} product types, extracted {len(attributes)} total attributes")
                         break  # Success, no need to try other environment
@@ -476,51 +842,60 @@ class AmazonSPAPI:
                     
                     env_name = "sandbox" if api_base_url == self.sandbox_url else "production"
                     # Try to search for a few items to get schema
-                    search_terms = ['shoes', 'books', 'electronics']
-                    for search_term in search_terms[:2]:  # Limit to avoid rate limits
+                    search_terms = ['shoes', 'books', 'electronics'][:2]  # Limit to avoid rate limits
+                    
+                    def search(search_term: str) -> requests.Response:
                         params = {
                             'marketplaceIds': marketplace_id,
                             'keywords': search_term,
                             'pageSize': 1
                         }
-                        
-                        try:
-                            logger.info(f"Fetching catalog items for schema inference (search: {search_term}, {env_name})...")
-                            response = requests.get(catalog_url, headers=headers_catalog, params=params)
-                            
-                            if response.status_code == 200:
-                                catalog_data = response.json()
-                                items = catalog_data.get('items', [])
+                        logger.info(f"Fetching catalog items for schema inference (search: {search_term}, {env_name})...")
+                        self.catalog_rate_limiter.acquire()
+                        response = self.session.get(catalog_url, headers=headers_catalog, params=params)
+                        self.catalog_rate_limiter.update_from_response(response)
+                        return response
+                    
+                    # Searches run concurrently; responses are still used in search_terms order
+                    with ThreadPoolExecutor(max_workers=len(search_terms)) as executor:
+                        futures = [executor.submit(search, search_term) for search_term in search_terms]
+                        for search_term, future in zip(search_terms, futures):
+                            try:
+                                response = future.result()
                                 
-                                for item in items:
-                                    # Extract attributes from actual item data
-                                    if isinstance(item, dict):
-                                        for key, value in item.items():
-                                            if key not in [attr.get('name', '').split('.')[-1] for attr in attributes]:
-                                                attributes.append({
-                                                    "name": f"Item.{key}",
-                                                    "required": False,
-                                                    "dataType": self._infer_data_type(value),
-                                                    "description": f"Field from catalog item API response",
-                                                    "source": "catalog_items_api"
-                                                })
+                                if response.status_code == 200:
+                                    catalog_data = _fast_json(response)
+                                    items = catalog_data.get('items', [])
+                                
+                                    for item in items:
+                                        # Extract attributes from actual item data
+                                        if isinstance(item, dict):
+                                            for key, value in item.items():
+                                                if key not in seen_names:
+                                                    add_attribute({
+                                                        "name": f"Item.{key}",
+                                                        "required": False,
+                                                        "dataType": self._infer_data_type(value),
+                                                        "description": f"Field from catalog item API response",
+                                                        "source": "catalog_items_api"
+                                                    })
                                                 
-                                                # If value is a dict, extract nested attributes
-                                                if isinstance(value, dict):
-                                                    for nested_key, nested_value in value.items():
-                                                        attributes.append({
-                                                            "name": f"Item.{key}.{nested_key}",
-                                                            "required": False,
-                                                            "dataType": self._infer_data_type(nested_value),
-                                                            "description": f"Nested field from catalog item",
-                                                            "source": "catalog_items_api"
-                                                        })
-                                break  # Got data, no need to try more searches
-                            else:
-                                logger.warning(f"Catalog Items API ({env_name}) returned {response.status_code} for {search_term}")
-                        except Exception as e:
-                            logger.warning(f"Error fetching catalog items for {search_term} ({env_name}): {e}")
-                            continue
+                                                    # If value is a dict, extract nested attributes
+                                                    if isinstance(value, dict):
+                                                        for nested_key, nested_value in value.items():
+                                                            add_attribute({
+                                                                "name": f"Item.{key}.{nested_key}",
+                                                                "required": False,
+                                                                "dataType": self._infer_data_type(nested_value),
+                                                                "description": f"Nested field from catalog item",
+                                                                "source": "catalog_items_api"
+                                                            })
+                                    break  # Got data, no need to try more searches
+                                else:
+                                    logger.warning(f"Catalog Items API ({env_name}) returned {response.status_code} for {search_term}")
+                            except Exception as e:
+                                logger.warning(f"Error fetching catalog items for {search_term} ({env_name}): {e}")
+                                continue
                     
                     # If we got attributes, break from environment loop
                     if attributes:
@@ -539,15 +914,21 @@ class AmazonSPAPI:
             product_type_summary = {}
             
             for attr in attributes:
-                # Extract canonical name (attribute name without product type prefix)
+                # Read each field once; they feed the summary, the canonical entry and the mapping
                 full_name = attr.get('name', '')
+                product_type = attr.get('productType', 'UNKNOWN')
+                required = attr.get('required', False)
+                data_type = attr.get('dataType', 'string')
+                description = attr.get('description', '')
+                property_group = attr.get('propertyGroup')
+                source = attr.get('source', 'unknown')
+                
+                # Extract canonical name (attribute name without product type prefix)
                 if '.' in full_name:
                     canonical_name = full_name.split('.', 1)[1]  # Remove product type prefix (e.g., "LUGGAGE.item_name" -> "item_name")
                 else:
                     canonical_name = full_name
                 
-                product_type = attr.get('productType', 'UNKNOWN')
-                
                 # Build product type summary
                 if product_type not in product_type_summary:
                     product_type_summary[product_type] = {
@@ -555,73 +936,60 @@ class AmazonSPAPI:
                         "propertyGroups": set()
                     }
                 product_type_summary[product_type]["count"] += 1
-                if attr.get('propertyGroup'):
-                    product_type_summary[product_type]["propertyGroups"].add(attr.get('propertyGroup'))
+                if property_group:
+                    product_type_summary[product_type]["propertyGroups"].add(property_group)
                 
-                # Build canonical attributes mapping
-                if canonical_name not in canonical_attributes:
+                mapping = {
+                    "originalName": full_name,
+                    "required": required,
+                    "dataType": data_type,
+                    "propertyGroup": property_group,
+                    "description": description
+                }
+                
+                # Build canonical attributes mapping. productTypes, propertyGroups and
+                # sources are accumulated as insertion-ordered dicts (O(1) membership)
+                # and turned into lists once every attribute has been merged.
+                ca = canonical_attributes.get(canonical_name)
+                if ca is None:
                     canonical_attributes[canonical_name] = {
                         "canonicalName": canonical_name,
-                        "required": attr.get('required', False),
-                        "dataType": attr.get('dataType', 'string'),
-                        "description": attr.get('description', ''),
-                        "productTypes": [product_type],
-                        "propertyGroups": [attr.get('propertyGroup')] if attr.get('propertyGroup') else [],
-                        "sources": [attr.get('source', 'unknown')],
-                        "mappings": {
-                            product_type: {
-                                "originalName": full_name,
-                                "required": attr.get('required', False),
-                                "dataType": attr.get('dataType', 'string'),
-                                "propertyGroup": attr.get('propertyGroup'),
-                                "description": attr.get('description', '')
-                            }
-                        }
+                        "required": required,
+                        "dataType": data_type,
+                        "description": description,
+                        "productTypes": {product_type: None},
+                        "propertyGroups": {property_group: None} if property_group else {},
+                        "sources": {source: None},
+                        "mappings": {product_type: mapping}
                     }
                 else:
                     # Merge with existing canonical attribute
-                    ca = canonical_attributes[canonical_name]
-                    
-                    # Add product type if not already present
-                    if product_type not in ca['productTypes']:
-                        ca['productTypes'].append(product_type)
-                    
-                    # Add property group if not already present
-                    pg = attr.get('propertyGroup')
-                    if pg and pg not in ca['propertyGroups']:
-                        ca['propertyGroups'].append(pg)
-                    
-                    # Update required flag (if any product type requires it, mark as required)
-                    if attr.get('required', False):
+                    ca['productTypes'].setdefault(product_type)
+                    if property_group:
+                        ca['propertyGroups'].setdefault(property_group)
+                    # If any product type requires it, mark as required
+                    if required:
                         ca['required'] = True
-                    
-                    # Add source if not already present
-                    src = attr.get('source', 'unknown')
-                    if src not in ca['sources']:
-                        ca['sources'].append(src)
-                    
-                    # Add mapping for this product type
-                    ca['mappings'][product_type] = {
-                        "originalName": full_name,
-                        "required": attr.get('required', False),
-                        "dataType": attr.get('dataType', 'string'),
-                        "propertyGroup": attr.get('propertyGroup'),
-                        "description": attr.get('description', '')
-                    }
+                    ca['sources'].setdefault(source)
+                    ca['mappings'][product_type] = mapping
             
-            # Convert sets to lists for JSON serialization
-            for pt in product_type_summary:
-                product_type_summary[pt]["propertyGroups"] = list(product_type_summary[pt]["propertyGroups"])
+            # Convert sets to sorted lists for JSON serialization (stable across runs;
+            # key=str keeps the sort total if a list-form group name isn't a string)
+            for summary in product_type_summary.values():
+                summary["propertyGroups"] = sorted(summary["propertyGroups"], key=str)
             
             # Convert canonical_attributes dict to list for easier use
             canonical_attributes_list = list(canonical_attributes.values())
+            for ca in canonical_attributes_list:
+                for key in ('productTypes', 'propertyGroups', 'sources'):
+                    ca[key] = list(ca[key])
             
             schema = {
                 "attributes": attributes,  # Full attributes with product type prefixes (e.g., "LUGGAGE.item_name")
                 "canonicalAttributes": canonical_attributes_list,  # Unified attributes without product type prefixes (for ZAG Converter)
-                "productTypes": sorted(list(product_type_summary.keys())),
+                "productTypes": sorted(product_type_summary),
                 "productTypeSummary": product_type_summary,
-                "extractedAt": datetime.now().isoformat(),
+                "extractedAt": extracted_at or datetime.now().isoformat(),
                 "source": "amazon_sp_api_direct",
                 "version": version,
                 "marketplaceId": marketplace_id,
@@ -638,34 +1006,18 @@ class AmazonSPAPI:
             logger.error(f"Error getting schema from Amazon SP-API: {e}")
             raise
     
-    def _infer_data_type(self, value: Any) -> str:
-        """Infer data type from value."""
-        if value is None:
-            return "null"
-        elif isinstance(value, bool):
-            return "boolean"
-        elif isinstance(value, int):
-            return "integer"
-        elif isinstance(value, float):
-            return "number"
-        elif isinstance(value, list):
-            if value and isinstance(value[0], dict):
-                return "array<object>"
-            return "array"
-        elif isinstance(value, dict):
-            return "object"
-        else:
-            return "string"
+    _infer_data_type = staticmethod(_infer_json_type)
     
-    def get_product_schema(self, marketplace_id: str) -> Dict[str, Any]:
+    def get_product_schema(self, marketplace_id: str, extracted_at: Optional[str] = None) -> Dict[str, Any]:
         """Get product type definitions schema from the actual API or OpenAPI specification."""
+        extracted_at = extracted_at or datetime.now().isoformat()
         # Try to use actual API first if credentials are provided
         if self.client_id and self.client_secret and self.refresh_token:
             try:
                 access_token = self._get_access_token()
                 if access_token:
                     try:
-                        return self._get_schema_from_api(marketplace_id, access_token)
+                        return self._get_schema_from_api(marketplace_id, access_token, extracted_at)
                     except Exception as e:
                         logger.warning(f"Error using Amazon SP-API: {e}, falling back to OpenAPI spec")
                 else:
@@ -682,11 +1034,11 @@ class AmazonSPAPI:
             schema_url = f"https://raw.githubusercontent.com/{self.repo_path}/main/{self.model_path}/catalogItems_{version}.json"
             
             logger.info(f"Downloading Amazon SP-API schema (version {version}) from {schema_url}...")
-            response = requests.get(schema_url)
+            response = self.session.get(schema_url)
             response.raise_for_status()
             logger.info("Successfully downloaded Amazon SP-API schema.")
             
-            openapi_spec = response.json()
+            openapi_spec = _fast_json(response)
             # Support both OpenAPI 3.0 (components.schemas) and Swagger 2.0 (definitions)
             if 'components' in openapi_spec:
                 schemas = openapi_spec.get('components', {}).get('schemas', {})
@@ -718,7 +1070,7 @@ class AmazonSPAPI:
 
             schema = {
                 "attributes": attributes,
-                "extractedAt": datetime.now().isoformat(),
+                "extractedAt": extracted_at,
                 "source": "amazon_sp_api_openapi_spec",
                 "version": version
             }
@@ -737,12 +1089,80 @@ class AmazonSPAPI:
             # Return error schema instead of raising to allow other APIs to continue
             return {
                 "attributes": [],
-                "extractedAt": datetime.now().isoformat(),
+                "extractedAt": extracted_at,
                 "source": "amazon_sp_api_openapi_spec",
                 "version": version,
                 "error": str(e)
             }
 
+# Mirakl product attributes from the documentation, used when nothing could be extracted.
+# Built once at import; each fallback schema gets its own copies of the dicts.
+_MIRAKL_FALLBACK_ATTRIBUTES = (
+    {
+        "name": "product_id",
+        "required": True,
+        "dataType": "string",
+        "description": "Unique product identifier",
+        "source": "fallback"
+    },
+    {
+        "name": "product_sku",
+        "required": True,
+        "dataType": "string",
+        "description": "Product SKU",
+        "source": "fallback"
+    },
+    {
+        "name": "title",
+        "required": True,
+        "dataType": "string",
+        "description": "Product title",
+        "source": "fallback"
+    },
+    {
+        "name": "description",
+        "required": False,
+        "dataType": "string",
+        "description": "Product description",
+        "source": "fallback"
+    },
+    {
+        "name": "category",
+        "required": False,
+        "dataType": "object",
+        "description": "Product category information",
+        "source": "fallback"
+    },
+    {
+        "name": "price",
+        "required": False,
+        "dataType": "number",
+        "description": "Product price",
+        "source": "fallback"
+    },
+    {
+        "name": "quantity",
+        "required": False,
+        "dataType": "integer",
+        "description": "Product quantity",
+        "source": "fallback"
+    },
+    {
+        "name": "images",
+        "required": False,
+        "dataType": "array",
+        "description": "Product images",
+        "source": "fallback"
+    },
+    {
+        "name": "attributes",
+        "required": False,
+        "dataType": "array",
+        "description": "Product attributes/custom fields",
+        "source": "fallback"
+    }
+)
+
 class MiraklAPI:
     """Mirakl Marketplace API client."""
     
@@ -761,6 +1181,13 @@ class MiraklAPI:
             # Default: use prod environment endpoint
             # Can be overridden via config file
             self.default_base_url = "https://onlinemetalsus-prod.mirakl.net/api"
+        # Keep-alive session reused across the OpenAPI, offers and hierarchies calls
+        self.session = _create_session(total=3, backoff_factor=0.5)
+        # Offers pagination: page size (Mirakl caps `max` at 100), page limit, and how many
+        # consecutive pages without new fields end the scan
+        self.offers_page_size = 100
+        self.max_offer_pages = 20
+        self.offer_pages_without_new_fields = 3
         self.config = APIConfig(
             name="mirakl_api",
             base_url=self.default_base_url,
@@ -795,8 +1222,116 @@ class MiraklAPI:
             params["api_key"] = self.api_key
         return params
     
-    def get_product_schema(self) -> Dict[str, Any]:
+    @staticmethod
+    def _extract_offers(offers_data: Any) -> List[Any]:
+        """Pull the list of offers out of an /offers response body, whatever its envelope."""
+        if isinstance(offers_data, dict):
+            if 'offers' in offers_data:
+                return offers_data['offers']
+            elif 'data' in offers_data:
+                return offers_data['data']
+            elif 'items' in offers_data:
+                return offers_data['items']
+            elif 'results' in offers_data:
+                return offers_data['results']
+            # Check if the dict itself is an offer (single offer response)
+            elif any(key in offers_data for key in ['offer_id', 'id', 'product_sku', 'sku', 'product_id', 'title', 'name']):
+                return [offers_data]
+        elif isinstance(offers_data, list):
+            return offers_data
+        return []
+    
+    def _fetch_offers_page(self, offers_url: str, headers: Dict[str, str], offset: int) -> requests.Response:
+        """GET one page of /offers."""
+        params = {"max": self.offers_page_size, "offset": offset}
+        # Note: Mirakl Seller API uses API key directly in Authorization header (not Bearer)
+        return self.session.get(offers_url, headers=headers, params=params, timeout=10)
+    
+    def _iter_offer_pages(self, offers_url: str, headers: Dict[str, str],
+                          first_page: Optional[Future] = None) -> Iterator[List[Any]]:
+        """Yield the offers of successive /offers pages.
+        
+        The next page is requested on a background thread while the caller processes the
+        current one. Paging stops at a short page, at total_count or after max_offer_pages;
+        a failed later page ends the iteration without discarding earlier pages. first_page
+        is an already started request for the first page, if there is one.
+        """
+        if first_page is not None:
+            response = first_page.result()
+        else:
+            response = self._fetch_offers_page(offers_url, headers, 0)
+        logger.info("Mirakl Offers API response status: %s", response.status_code)
+        if response.status_code != 200:
+            return
+        offers_data = _fast_json(response)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Mirakl Offers API response structure: %s",
+                        list(offers_data.keys()) if isinstance(offers_data, dict) else 'list')
+        total_count = offers_data.get('total_count') if isinstance(offers_data, dict) else None
+        offers = self._extract_offers(offers_data)
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = 1
+            while True:
+                offset = page * self.offers_page_size
+                next_page = None
+                if (len(offers) >= self.offers_page_size and page < self.max_offer_pages
+                        and (not isinstance(total_count, int) or offset < total_count)):
+                    next_page = executor.submit(self._fetch_offers_page, offers_url, headers, offset)
+                yield offers
+                if next_page is None:
+                    return
+                try:
+                    response = next_page.result()
+                    if response.status_code != 200:
+                        logger.warning("Stopped paging Mirakl offers at offset %d: HTTP %s", offset, response.status_code)
+                        return
+                    offers = self._extract_offers(_fast_json(response))
+                except Exception as e:
+                    logger.warning("Stopped paging Mirakl offers at offset %d: %s", offset, e)
+                    return
+                page += 1
+    
+    def _extract_sample_fields(self, record: Dict[str, Any], prefix: str, source: str,
+                               attributes: List[Dict[str, Any]], existing_names: set,
+                               field_description: str, nested_description: str,
+                               array_description: str) -> None:
+        """Append attributes for the fields of a sample API record.
+        
+        Fields whose name is already in existing_names are skipped. A new field that holds
+        an object, or an array of objects, also gets one attribute per key of that object
+        (of its first item, for arrays). Appended names are recorded in existing_names.
+        """
+        for key, value in record.items():
+            if key in existing_names:
+                continue
+            attributes.append(_record(existing_names, {
+                "name": f"{prefix}.{key}",
+                "required": False,
+                "dataType": self._infer_data_type(value),
+                "description": field_description,
+                "source": source
+            }))
+            
+            if isinstance(value, dict):
+                children, child_description = value, nested_description
+            elif isinstance(value, list) and value and isinstance(value[0], dict):
+                children, child_description = value[0], array_description
+            else:
+                continue
+            for child_key, child_value in children.items():
+                attributes.append(_record(existing_names, {
+                    "name": f"{prefix}.{key}.{child_key}",
+                    "required": False,
+                    "dataType": self._infer_data_type(child_value),
+                    "description": child_description,
+                    "source": source,
+                    "parentField": key
+                }))
+    
+    def get_product_schema(self, extracted_at: Optional[str] = None) -> Dict[str, Any]:
         """Get product schema from Mirakl API."""
+        extracted_at = extracted_at or datetime.now().isoformat()
         attributes = []
         version = datetime.now().strftime("%Y-%m-%d")
         base_url = self._get_base_url()
@@ -806,26 +1341,27 @@ class MiraklAPI:
             # Method 1: Load OpenAPI specification from local files
             # Priority: Seller > Front > Operator (since we're using Seller API)
             openapi_files = [
-                ("seller", Path(__file__).parent.parent / "openapi3-download_seller.json"),
-                ("front", Path(__file__).parent.parent / "openapi3-download_front.json"),
-                ("operator", Path(__file__).parent.parent / "openapi3-download_operator.json")
+                ("seller", PROJECT_DIR / "openapi3-download_seller.json"),
+                ("front", PROJECT_DIR / "openapi3-download_front.json"),
+                ("operator", PROJECT_DIR / "openapi3-download_operator.json")
             ]
             
             openapi_spec = None
             openapi_source = None
             
-            # Try to load from local files first
+            # Try to load from local files first, in priority order; a lower-priority file
+            # is only read when the ones before it are missing or fail to load
             for source_name, file_path in openapi_files:
                 if file_path.exists():
                     try:
-                        logger.info(f"Loading Mirakl OpenAPI specification from {file_path.name} ({source_name})...")
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            openapi_spec = json.load(f)
+                        logger.info("Loading Mirakl OpenAPI specification from %s (%s)...", file_path.name, source_name)
+                        with open(file_path, 'rb') as f:
+                            openapi_spec = _json_loads(f.read())
                         openapi_source = source_name
-                        logger.info(f"Successfully loaded Mirakl OpenAPI specification from {source_name}")
+                        logger.info("Successfully loaded Mirakl OpenAPI specification from %s", source_name)
                         break
                     except Exception as e:
-                        logger.warning(f"Failed to load OpenAPI file {file_path}: {e}")
+                        logger.warning("Failed to load OpenAPI file %s: %s", file_path, e)
                         continue
             
             # Fallback: Try to fetch from API endpoint
@@ -833,31 +1369,39 @@ class MiraklAPI:
                 auth_params = self._get_auth_params()
                 openapi_url = f"{base_url}/openapi.json"
                 try:
-                    logger.info(f"Attempting to fetch Mirakl OpenAPI specification from {openapi_url}...")
-                    response = requests.get(openapi_url, headers=headers, params=auth_params, timeout=10)
+                    logger.info("Attempting to fetch Mirakl OpenAPI specification from %s...", openapi_url)
+                    response = self.session.get(openapi_url, headers=headers, params=auth_params, timeout=10)
                     if response.status_code == 200:
-                        openapi_spec = response.json()
+                        openapi_spec = _fast_json(response)
                         openapi_source = "api_endpoint"
                         logger.info("Successfully downloaded Mirakl OpenAPI specification from API")
                 except Exception as e:
-                    logger.debug(f"OpenAPI spec not available from API: {e}")
+                    logger.debug("OpenAPI spec not available from API: %s", e)
             
             # Extract schemas from OpenAPI spec
             if openapi_spec and 'components' in openapi_spec and 'schemas' in openapi_spec['components']:
                 schemas = openapi_spec['components']['schemas']
-                logger.info(f"Processing {len(schemas)} schemas from OpenAPI specification...")
+                # Only components.schemas is used below; drop the rest of the spec (paths etc.)
+                # so it can be freed before the extraction loop
+                openapi_spec = None
+                logger.info("Processing %d schemas from OpenAPI specification...", len(schemas))
                 
                 # Look for product/offer/service related schemas
                 # Check both schema name and properties content
                 processed_schemas = set()
+                # $ref -> (schema name, properties, required), or None if it doesn't resolve
+                ref_cache: Dict[str, Optional[Tuple[str, Dict[str, Any], List[str]]]] = {}
+                # One shared source string per kind instead of an f-string per attribute
+                source_direct = f"openapi_{openapi_source}"
+                source_ref = f"openapi_{openapi_source}_ref"
+                source_inline = f"openapi_{openapi_source}_inline"
                 for schema_name, schema_def in schemas.items():
                     schema_lower = schema_name.lower()
-                    schema_str = json.dumps(schema_def).lower()
                     
                     # Check if schema is related to products/offers/services
                     is_product_related = (
-                        any(keyword in schema_lower for keyword in ['offer', 'product', 'item', 'catalog', 'service', 'sku']) or
-                        any(keyword in schema_str for keyword in ['offer', 'product', 'sku', 'price', 'quantity', 'title', 'description', 'catalog'])
+                        _PRODUCT_NAME_KEYWORDS_RE.search(schema_lower) is not None or
+                        _contains_keyword(schema_def, _PRODUCT_CONTENT_KEYWORDS_RE)
                     )
                     
                     if is_product_related:
@@ -882,33 +1426,37 @@ class MiraklAPI:
                                         "dataType": data_type,
                                         "description": prop_def.get("description", ""),
                                         "schema": schema_name,
-                                        "source": f"openapi_{openapi_source}"
+                                        "source": source_direct
                                     })
                                     
                                     # If property is an object, extract nested properties
                                     if isinstance(prop_def, dict):
                                         if "$ref" in prop_def:
-                                            # Resolve reference
-                                            ref_path = prop_def["$ref"].split("/")
-                                            if len(ref_path) == 4 and ref_path[1] == "components" and ref_path[2] == "schemas":
-                                                ref_schema_name = ref_path[3]
-                                                if ref_schema_name in schemas:
-                                                    ref_schema = schemas[ref_schema_name]
-                                                    ref_properties = ref_schema.get("properties", {})
-                                                    ref_required = ref_schema.get("required", [])
-                                                    for ref_prop_name, ref_prop_def in ref_properties.items():
-                                                        nested_attr_name = f"{schema_name}.{prop_name}.{ref_prop_name}"
-                                                        if nested_attr_name not in processed_schemas:
-                                                            processed_schemas.add(nested_attr_name)
-                                                            attributes.append({
-                                                                "name": nested_attr_name,
-                                                                "required": ref_prop_name in ref_required,
-                                                                "dataType": self._extract_data_type(ref_prop_def),
-                                                                "description": ref_prop_def.get("description", ""),
-                                                                "schema": ref_schema_name,
-                                                                "parentField": prop_name,
-                                                                "source": f"openapi_{openapi_source}_ref"
-                                                            })
+                                            # Resolve reference (each distinct $ref only once)
+                                            ref = prop_def["$ref"]
+                                            if ref not in ref_cache:
+                                                ref_cache[ref] = None
+                                                ref_path = ref.split("/")
+                                                if len(ref_path) == 4 and ref_path[1] == "components" and ref_path[2] == "schemas":
+                                                    if ref_path[3] in schemas:
+                                                        ref_schema = schemas[ref_path[3]]
+                                                        ref_cache[ref] = (ref_path[3], ref_schema.get("properties", {}),
+                                                                          ref_schema.get("required", []))
+                                            if ref_cache[ref] is not None:
+                                                ref_schema_name, ref_properties, ref_required = ref_cache[ref]
+                                                for ref_prop_name, ref_prop_def in ref_properties.items():
+                                                    nested_attr_name = f"{schema_name}.{prop_name}.{ref_prop_name}"
+                                                    if nested_attr_name not in processed_schemas:
+                                                        processed_schemas.add(nested_attr_name)
+                                                        attributes.append({
+                                                            "name": nested_attr_name,
+                                                            "required": ref_prop_name in ref_required,
+                                                            "dataType": self._extract_data_type(ref_prop_def),
+                                                            "description": ref_prop_def.get("description", ""),
+                                                            "schema": ref_schema_name,
+                                                            "parentField": prop_name,
+                                                            "source": source_ref
+                                                        })
                                         elif prop_def.get("type") == "object" and "properties" in prop_def:
                                             # Inline object definition
                                             nested_props = prop_def["properties"]
@@ -924,103 +1472,66 @@ class MiraklAPI:
                                                         "description": nested_prop_def.get("description", ""),
                                                         "schema": schema_name,
                                                         "parentField": prop_name,
-                                                        "source": f"openapi_{openapi_source}_inline"
+                                                        "source": source_inline
                                                     })
                 
-                logger.info(f"Extracted {len([a for a in attributes if 'openapi' in a.get('source', '')])} attributes from OpenAPI specification")
+                # Only the OpenAPI step has added attributes so far
+                logger.info("Extracted %d attributes from OpenAPI specification", len(attributes))
+            
+            # Last name segments of the attributes collected so far; the offers and
+            # hierarchies fallbacks skip fields whose name is already present
+            existing_names = {attr.get('name', '').split('.')[-1] for attr in attributes}
+            
+            # The offers and hierarchies fallbacks are only needed when the OpenAPI spec didn't
+            # give enough attributes; they are then fetched concurrently so their latencies overlap
+            fallback_executor = None
+            if not attributes or len(attributes) < 10:
+                offers_url = f"{base_url}/offers"
+                hierarchies_url = f"{base_url}/hierarchies"
+                fallback_executor = ThreadPoolExecutor(max_workers=2)
+                first_offers_page = fallback_executor.submit(self._fetch_offers_page, offers_url, headers, 0)
+                hierarchies_request = fallback_executor.submit(
+                    self.session.get, hierarchies_url, headers=headers, params={"max": 1}, timeout=10)
             
             # Method 2: Get actual offer data from Offers API to infer schema
             # Mirakl Seller API uses /offers endpoint, not /products
             if not attributes or len(attributes) < 10:  # If OpenAPI didn't give us enough, try API
                 try:
-                    offers_url = f"{base_url}/offers"
-                    logger.info(f"Fetching offers from Mirakl API to infer schema...")
-                    
-                    # Try to get sample offers
-                    params = {"max": 10}  # Get multiple offers for comprehensive schema
-                    # Note: Mirakl Seller API uses API key directly in Authorization header (not Bearer)
-                    response = requests.get(offers_url, headers=headers, params=params, timeout=10)
+                    logger.info("Fetching offers from Mirakl API to infer schema...")
                     
-                    logger.info(f"Mirakl Offers API response status: {response.status_code}")
-                    if response.status_code == 200:
-                        offers_data = response.json()
-                        logger.info(f"Mirakl Offers API response structure: {list(offers_data.keys()) if isinstance(offers_data, dict) else 'list'}")
-                        
-                        # Handle different response structures
-                        offers = []
-                        if isinstance(offers_data, dict):
-                            if 'offers' in offers_data:
-                                offers = offers_data['offers']
-                            elif 'data' in offers_data:
-                                offers = offers_data['data']
-                            elif 'items' in offers_data:
-                                offers = offers_data['items']
-                            elif 'results' in offers_data:
-                                offers = offers_data['results']
-                            # Check if the dict itself is an offer (single offer response)
-                            elif any(key in offers_data for key in ['offer_id', 'id', 'product_sku', 'sku', 'product_id', 'title', 'name']):
-                                offers = [offers_data]
-                        elif isinstance(offers_data, list):
-                            offers = offers_data
-                        
-                        logger.info(f"Found {len(offers)} offers from Mirakl API")
-                        for offer in offers[:5]:  # Use first 5 offers to get comprehensive schema
+                    # Page through offers until a few consecutive pages add no new fields
+                    offer_count = 0
+                    unchanged_pages = 0
+                    for offers in self._iter_offer_pages(offers_url, headers, first_offers_page):
+                        offer_count += len(offers)
+                        attribute_count = len(attributes)
+                        for offer in offers:
                             if isinstance(offer, dict):
-                                for key, value in offer.items():
-                                    # Check if attribute already exists (by name without prefix)
-                                    existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                    if key not in existing_names:
-                                        attributes.append({
-                                            "name": f"Offer.{key}",
-                                            "required": False,
-                                            "dataType": self._infer_data_type(value),
-                                            "description": f"Field from Mirakl Offers API",
-                                            "source": "offers_api"
-                                        })
-                                        
-                                        # Extract nested attributes
-                                        if isinstance(value, dict):
-                                            for nested_key, nested_value in value.items():
-                                                nested_name = f"{key}.{nested_key}"
-                                                if nested_name not in existing_names:
-                                                    attributes.append({
-                                                        "name": f"Offer.{key}.{nested_key}",
-                                                        "required": False,
-                                                        "dataType": self._infer_data_type(nested_value),
-                                                        "description": f"Nested field from Mirakl API",
-                                                        "source": "offers_api",
-                                                        "parentField": key
-                                                    })
-                                        
-                                        # If value is array of objects, extract structure from first item
-                                        if isinstance(value, list) and value and isinstance(value[0], dict):
-                                            for array_item_key in value[0].keys():
-                                                array_name = f"{key}.{array_item_key}"
-                                                if array_name not in existing_names:
-                                                    attributes.append({
-                                                        "name": f"Offer.{key}.{array_item_key}",
-                                                        "required": False,
-                                                        "dataType": self._infer_data_type(value[0][array_item_key]),
-                                                        "description": f"Array item field from Mirakl API",
-                                                        "source": "offers_api",
-                                                        "parentField": key
-                                                    })
+                                self._extract_sample_fields(
+                                    offer, "Offer", "offers_api", attributes, existing_names,
+                                    field_description="Field from Mirakl Offers API",
+                                    nested_description="Nested field from Mirakl API",
+                                    array_description="Array item field from Mirakl API")
+                        unchanged_pages = unchanged_pages + 1 if len(attributes) == attribute_count else 0
+                        if unchanged_pages >= self.offer_pages_without_new_fields:
+                            break
+                    logger.info("Found %d offers from Mirakl API", offer_count)
                     
                 except Exception as e:
-                    logger.warning(f"Error fetching offers from Mirakl API: {e}")
+                    logger.warning("Error fetching offers from Mirakl API: %s", e)
             
             # Method 3: Get category hierarchies to understand product structure
             if not attributes or len(attributes) < 10:
                 try:
-                    hierarchies_url = f"{base_url}/hierarchies"
-                    logger.info(f"Fetching hierarchies from Mirakl API...")
-                    params = {"max": 1}
-                    response = requests.get(hierarchies_url, headers=headers, params=params, timeout=10)
+                    logger.info("Fetching hierarchies from Mirakl API...")
+                    response = hierarchies_request.result()
                     
-                    logger.info(f"Mirakl Hierarchies API response status: {response.status_code}")
+                    logger.info("Mirakl Hierarchies API response status: %s", response.status_code)
                     if response.status_code == 200:
-                        logger.info(f"Mirakl Hierarchies API response structure: {list(response.json().keys()) if isinstance(response.json(), dict) else 'list'}")
-                        hierarchies_data = response.json()
+                        hierarchies_data = _fast_json(response)
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info("Mirakl Hierarchies API response structure: %s",
+                                        list(hierarchies_data.keys()) if isinstance(hierarchies_data, dict) else 'list')
                         
                         # Extract category-related attributes
                         hierarchies = []
@@ -1035,52 +1546,22 @@ class MiraklAPI:
                             hierarchies = hierarchies_data
                         
                         if hierarchies:
-                            logger.info(f"Found {len(hierarchies)} hierarchies from Mirakl API")
+                            logger.info("Found %d hierarchies from Mirakl API", len(hierarchies))
                             # Extract attributes from first few hierarchies
                             for hierarchy in hierarchies[:3]:
                                 if isinstance(hierarchy, dict):
-                                    for key, value in hierarchy.items():
-                                        # Check if attribute already exists
-                                        existing_names = [attr.get('name', '').split('.')[-1] for attr in attributes]
-                                        if key not in existing_names:
-                                            attributes.append({
-                                                "name": f"Category.{key}",
-                                                "required": False,
-                                                "dataType": self._infer_data_type(value),
-                                                "description": f"Category field from Mirakl Hierarchies API",
-                                                "source": "hierarchies_api"
-                                            })
-                                            
-                                            # Extract nested attributes
-                                            if isinstance(value, dict):
-                                                for nested_key, nested_value in value.items():
-                                                    nested_name = f"{key}.{nested_key}"
-                                                    if nested_name not in existing_names:
-                                                        attributes.append({
-                                                            "name": f"Category.{key}.{nested_key}",
-                                                            "required": False,
-                                                            "dataType": self._infer_data_type(nested_value),
-                                                            "description": f"Nested category field from Mirakl API",
-                                                            "source": "hierarchies_api",
-                                                            "parentField": key
-                                                        })
-                                            
-                                            # If value is array of objects, extract structure from first item
-                                            if isinstance(value, list) and value and isinstance(value[0], dict):
-                                                for array_item_key in value[0].keys():
-                                                    array_name = f"{key}.{array_item_key}"
-                                                    if array_name not in existing_names:
-                                                        attributes.append({
-                                                            "name": f"Category.{key}.{array_item_key}",
-                                                            "required": False,
-                                                            "dataType": self._infer_data_type(value[0][array_item_key]),
-                                                            "description": f"Array item field from Mirakl Hierarchies API",
-                                                            "source": "hierarchies_api",
-                                                            "parentField": key
-                                                        })
+                                    self._extract_sample_fields(
+                                        hierarchy, "Category", "hierarchies_api", attributes, existing_names,
+                                        field_description="Category field from Mirakl Hierarchies API",
+                                        nested_description="Nested category field from Mirakl API",
+                                        array_description="Array item field from Mirakl Hierarchies API")
                 
                 except Exception as e:
-                    logger.warning(f"Error fetching hierarchies from Mirakl API: {e}")
+                    logger.warning("Error fetching hierarchies from Mirakl API: %s", e)
+            
+            if fallback_executor is not None:
+                # Don't wait for (or still start) a hierarchies request Method 3 didn't need
+                fallback_executor.shutdown(wait=False, cancel_futures=True)
             
             if not attributes:
                 logger.warning("No attributes extracted from Mirakl API, using fallback schema")
@@ -1089,21 +1570,21 @@ class MiraklAPI:
             
             schema = {
                 "attributes": attributes,
-                "extractedAt": datetime.now().isoformat(),
+                "extractedAt": extracted_at,
                 "source": "mirakl_api",
                 "version": version,
                 "apiBaseUrl": base_url
             }
             
-            logger.info(f"Extracted {len(attributes)} attributes from Mirakl API")
+            logger.info("Extracted %d attributes from Mirakl API", len(attributes))
             return schema
             
         except Exception as e:
-            logger.error(f"Error extracting Mirakl API schema: {e}")
+            logger.error("Error extracting Mirakl API schema: %s", e)
             # Return fallback schema on error
             return {
                 "attributes": self._get_fallback_schema(),
-                "extractedAt": datetime.now().isoformat(),
+                "extractedAt": extracted_at,
                 "source": "mirakl_api_fallback",
                 "version": version,
                 "error": str(e)
@@ -1116,101 +1597,91 @@ class MiraklAPI:
         if prop_type == "array":
             items = prop_def.get("items", {})
             item_type = items.get("type", "string")
-            return f"array<{item_type}>"
+            return _intern(f"array<{item_type}>")
         
         if "$ref" in prop_def:
             # Reference to another schema
             ref = prop_def["$ref"]
-            return f"ref:{ref.split('/')[-1]}"
+            return _intern(f"ref:{ref.split('/')[-1]}")
         
-        return prop_type
+        return _intern(prop_type)
     
-    def _infer_data_type(self, value: Any) -> str:
-        """Infer data type from value."""
-        if value is None:
-            return "null"
-        elif isinstance(value, bool):
-            return "boolean"
-        elif isinstance(value, int):
-            return "integer"
-        elif isinstance(value, float):
-            return "number"
-        elif isinstance(value, list):
-            if value and isinstance(value[0], dict):
-                return "array<object>"
-            return "array"
-        elif isinstance(value, dict):
-            return "object"
-        else:
-            return "string"
+    _infer_data_type = staticmethod(_infer_json_type)
     
     def _get_fallback_schema(self) -> List[Dict[str, Any]]:
         """Fallback schema based on Mirakl documentation."""
-        return [
-            {
-                "name": "product_id",
-                "required": True,
-                "dataType": "string",
-                "description": "Unique product identifier",
-                "source": "fallback"
-            },
-            {
-                "name": "product_sku",
-                "required": True,
-                "dataType": "string",
-                "description": "Product SKU",
-                "source": "fallback"
-            },
-            {
-                "name": "title",
-                "required": True,
-                "dataType": "string",
-                "description": "Product title",
-                "source": "fallback"
-            },
-            {
-                "name": "description",
-                "required": False,
-                "dataType": "string",
-                "description": "Product description",
-                "source": "fallback"
-            },
-            {
-                "name": "category",
-                "required": False,
-                "dataType": "object",
-                "description": "Product category information",
-                "source": "fallback"
-            },
-            {
-                "name": "price",
-                "required": False,
-                "dataType": "number",
-                "description": "Product price",
-                "source": "fallback"
-            },
-            {
-                "name": "quantity",
-                "required": False,
-                "dataType": "integer",
-                "description": "Product quantity",
-                "source": "fallback"
-            },
-            {
-                "name": "images",
-                "required": False,
-                "dataType": "array",
-                "description": "Product images",
-                "source": "fallback"
-            },
-            {
-                "name": "attributes",
-                "required": False,
-                "dataType": "array",
-                "description": "Product attributes/custom fields",
-                "source": "fallback"
-            }
-        ]
+        return [dict(attr) for attr in _MIRAKL_FALLBACK_ATTRIBUTES]
+
+# Shopify product fields and metafields reported by ShopifyAdminAPI. Built once at import;
+# each schema gets its own copies of the dicts.
+_SHOPIFY_PRODUCT_ATTRIBUTES = (
+    {
+        "name": "id",
+        "required": True,
+        "dataType": "integer",
+        "description": "Product ID"
+    },
+    {
+        "name": "title",
+        "required": True,
+        "dataType": "string",
+        "maxLength": 255,
+        "description": "Product title"
+    },
+    {
+        "name": "body_html",
+        "required": False,
+        "dataType": "string",
+        "description": "Product description HTML"
+    },
+    {
+        "name": "vendor",
+        "required": False,
+        "dataType": "string",
+        "maxLength": 255,
+        "description": "Product vendor"
+    },
+    {
+        "name": "product_type",
+        "required": False,
+        "dataType": "string",
+        "maxLength": 255,
+        "description": "Product type"
+    },
+    {
+        "name": "tags",
+        "required": False,
+        "dataType": "string",
+        "description": "Product tags (comma-separated)"
+    },
+    {
+        "name": "variants",
+        "required": True,
+        "dataType": "array",
+        "description": "Product variants"
+    }
+)
+
+_SHOPIFY_PRODUCT_METAFIELDS = (
+    {
+        "namespace": "custom",
+        "key": "size",
+        "type": "single_line_text_field",
+        "description": "Product size"
+    },
+    {
+        "namespace": "custom",
+        "key": "color",
+        "type": "single_line_text_field",
+        "description": "Product color"
+    },
+    {
+        "namespace": "custom",
+        "key": "material",
+        "type": "single_line_text_field",
+        "description": "Product material"
+    }
+)
 
 class ShopifyAdminAPI:
     """Shopify Admin API client."""
@@ -1229,22 +1700,25 @@ class ShopifyAdminAPI:
                 "X-Shopify-Access-Token": access_token
             }
         )
+        # Keep-alive session carrying the auth headers for every Admin API call
+        self.session = _create_session(total=2, backoff_factor=0.3)
+        self.session.headers.update(self.config.headers)
     
-    def get_product_schema(self) -> Dict[str, Any]:
+    def get_product_schema(self, extracted_at: Optional[str] = None) -> Dict[str, Any]:
         """Get product schema and metafields."""
         try:
             # 実際のAPI呼び出し（本番環境）
             
             # 商品スキーマ取得
             products_url = f"{self.base_url}/products.json?limit=1"
-            response = requests.get(products_url, headers=self.config.headers)
+            response = self.session.get(products_url)
             
             if response.status_code == 200:
-                products_data = response.json()
-                schema = self._parse_product_schema(products_data)
+                products_data = _fast_json(response)
+                schema = self._parse_product_schema(products_data, extracted_at)
             else:
                 # フォールバック: モックデータ
-                schema = self._get_mock_schema()
+                schema = self._get_mock_schema(extracted_at)
             
             logger.info(f"Extracted {len(schema['attributes'])} attributes from Shopify Admin API")
             return schema
@@ -1252,158 +1726,26 @@ class ShopifyAdminAPI:
         except Exception as e:
             logger.error(f"Error extracting Shopify Admin API schema: {e}")
             # フォールバック: モックデータ
-            return self._get_mock_schema()
+            return self._get_mock_schema(extracted_at)
     
-    def _parse_product_schema(self, products_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse actual product data to extract schema."""
-        schema = {
-            "attributes": [
-                {
-                    "name": "id",
-                    "required": True,
-                    "dataType": "integer",
-                    "description": "Product ID"
-                },
-                {
-                    "name": "title",
-                    "required": True,
-                    "dataType": "string",
-                    "maxLength": 255,
-                    "description": "Product title"
-                },
-                {
-                    "name": "body_html",
-                    "required": False,
-                    "dataType": "string",
-                    "description": "Product description HTML"
-                },
-                {
-                    "name": "vendor",
-                    "required": False,
-                    "dataType": "string",
-                    "maxLength": 255,
-                    "description": "Product vendor"
-                },
-                {
-                    "name": "product_type",
-                    "required": False,
-                    "dataType": "string",
-                    "maxLength": 255,
-                    "description": "Product type"
-                },
-                {
-                    "name": "tags",
-                    "required": False,
-                    "dataType": "string",
-                    "description": "Product tags (comma-separated)"
-                },
-                {
-                    "name": "variants",
-                    "required": True,
-                    "dataType": "array",
-                    "description": "Product variants"
-                }
-            ],
-            "metafields": [
-                {
-                    "namespace": "custom",
-                    "key": "size",
-                    "type": "single_line_text_field",
-                    "description": "Product size"
-                },
-                {
-                    "namespace": "custom",
-                    "key": "color",
-                    "type": "single_line_text_field",
-                    "description": "Product color"
-                },
-                {
-                    "namespace": "custom",
-                    "key": "material",
-                    "type": "single_line_text_field",
-                    "description": "Product material"
-                }
-            ],
-            "extractedAt": datetime.now().isoformat(),
+    def _build_schema(self, extracted_at: Optional[str] = None) -> Dict[str, Any]:
+        """Assemble the Shopify product schema from the module-level field definitions."""
+        return {
+            "attributes": [dict(attr) for attr in _SHOPIFY_PRODUCT_ATTRIBUTES],
+            "metafields": [dict(metafield) for metafield in _SHOPIFY_PRODUCT_METAFIELDS],
+            "extractedAt": extracted_at or datetime.now().isoformat(),
             "source": "shopify_admin_api",
             "version": "2024-01"
         }
-        return schema
     
-    def _get_mock_schema(self) -> Dict[str, Any]:
+    def _parse_product_schema(self, products_data: Dict[str, Any],
+                              extracted_at: Optional[str] = None) -> Dict[str, Any]:
+        """Parse actual product data to extract schema."""
+        return self._build_schema(extracted_at)
+    
+    def _get_mock_schema(self, extracted_at: Optional[str] = None) -> Dict[str, Any]:
         """Fallback mock schema for demo purposes."""
-        return {
-            "attributes": [
-                {
-                    "name": "id",
-                    "required": True,
-                    "dataType": "integer",
-                    "description": "Product ID"
-                },
-                {
-                    "name": "title",
-                    "required": True,
-                    "dataType": "string",
-                    "maxLength": 255,
-                    "description": "Product title"
-                },
-                {
-                    "name": "body_html",
-                    "required": False,
-                    "dataType": "string",
-                    "description": "Product description HTML"
-                },
-                {
-                    "name": "vendor",
-                    "required": False,
-                    "dataType": "string",
-                    "maxLength": 255,
-                    "description": "Product vendor"
-                },
-                {
-                    "name": "product_type",
-                    "required": False,
-                    "dataType": "string",
-                    "maxLength": 255,
-                    "description": "Product type"
-                },
-                {
-                    "name": "tags",
-                    "required": False,
-                    "dataType": "string",
-                    "description": "Product tags (comma-separated)"
-                },
-                {
-                    "name": "variants",
-                    "required": True,
-                    "dataType": "array",
-                    "description": "Product variants"
-                }
-            ],
-            "metafields": [
-                {
-                    "namespace": "custom",
-                    "key": "size",
-                    "type": "single_line_text_field",
-                    "description": "Product size"
-                },
-                {
-                    "namespace": "custom",
-                    "key": "color",
-                    "type": "single_line_text_field",
-                    "description": "Product color"
-                },
-                {
-                    "namespace": "custom",
-                    "key": "material",
-                    "type": "single_line_text_field",
-                    "description": "Product material"
-                }
-            ],
-            "extractedAt": datetime.now().isoformat(),
-            "source": "shopify_admin_api",
-            "version": "2024-01"
-        }
+        return self._build_schema(extracted_at)
 
 class SchemaExtractor:
     """Main schema extraction orchestrator."""
@@ -1417,33 +1759,31 @@ class SchemaExtractor:
         self.apis[name] = api_client
     
     def extract_all_schemas(self, google_merchant_id: str) -> Dict[str, Any]:
-        """Extract schemas from all registered APIs."""
-        tasks = []
+        """Extract schemas from all registered APIs.
         
-        for name, api_client in self.apis.items():
-            if name == "google_merchant_center":
-                task = api_client.get_product_schema(google_merchant_id)
-            elif name == "amazon_sp_api":
-                task = api_client.get_product_schema("ATVPDKIKX0DER")
-            elif name == "shopify_admin_api":
-                task = api_client.get_product_schema()
-            elif name == "mirakl_api":
-                task = api_client.get_product_schema()
-            else:
-                continue
-            
-            tasks.append((name, task))
+        The APIs are independent and network-bound, so they are queried concurrently;
+        results are collected in registration order. Every schema of the run carries the
+        same extractedAt timestamp.
+        """
+        extracted_at = datetime.now().isoformat()
+        calls = {
+            "google_merchant_center": lambda client: client.get_product_schema(google_merchant_id, extracted_at=extracted_at),
+            "amazon_sp_api": lambda client: client.get_product_schema("ATVPDKIKX0DER", extracted_at=extracted_at),
+            "shopify_admin_api": lambda client: client.get_product_schema(extracted_at=extracted_at),
+            "mirakl_api": lambda client: client.get_product_schema(extracted_at=extracted_at),
+        }
+        apis = [(name, api_client) for name, api_client in self.apis.items() if name in calls]
         
-        # Execute all API calls
         results = {}
-        for name, task in tasks:
-            try:
-                schema = task
-                results[name] = schema
-                logger.info(f"Successfully extracted schema from {name}")
-            except Exception as e:
-                logger.error(f"Failed to extract schema from {name}: {e}")
-                results[name] = {"error": str(e)}
+        with ThreadPoolExecutor(max_workers=max(len(apis), 1)) as executor:
+            futures = [(name, executor.submit(calls[name], api_client)) for name, api_client in apis]
+            for name, future in futures:
+                try:
+                    results[name] = future.result()
+                    logger.info(f"Successfully extracted schema from {name}")
+                except Exception as e:
+                    logger.error(f"Failed to extract schema from {name}: {e}")
+                    results[name] = {"error": str(e)}
         
         self.results = results
         return results
@@ -1458,35 +1798,36 @@ class SchemaExtractor:
             
             for attr in schema.get("attributes", []):
                 attr_name = attr["name"].lower()
+                data_type = attr.get("dataType", "string")
+                required = attr.get("required", False)
+                max_length = attr.get("maxLength")
                 
-                if attr_name not in canonical_attributes:
-                    canonical_attributes[attr_name] = {
+                entry = canonical_attributes.get(attr_name)
+                if entry is None:
+                    entry = canonical_attributes[attr_name] = {
                         "canonicalName": attr_name,
                         "mappings": {},
-                        "dataTypes": set(),
-                        "requiredFlags": set(),
-                        "maxLengths": set()
+                        # Distinct values in first-seen order; only a handful per attribute,
+                        # so plain lists beat sets and need no conversion afterwards
+                        "dataTypes": [],
+                        "requiredFlags": [],
+                        "maxLengths": []
                     }
                 
-                mapping = canonical_attributes[attr_name]["mappings"]
-                mapping[mp_name] = {
+                entry["mappings"][mp_name] = {
                     "mpAttributeName": attr["name"],
-                    "required": attr.get("required", False),
-                    "dataType": attr.get("dataType", "string"),
-                    "maxLength": attr.get("maxLength"),
+                    "required": required,
+                    "dataType": data_type,
+                    "maxLength": max_length,
                     "description": attr.get("description", "")
                 }
                 
-                canonical_attributes[attr_name]["dataTypes"].add(attr.get("dataType", "string"))
-                canonical_attributes[attr_name]["requiredFlags"].add(attr.get("required", False))
-                if attr.get("maxLength"):
-                    canonical_attributes[attr_name]["maxLengths"].add(attr["maxLength"])
-        
-        # Convert sets to lists for JSON serialization
-        for attr_name, attr_data in canonical_attributes.items():
-            attr_data["dataTypes"] = list(attr_data["dataTypes"])
-            attr_data["requiredFlags"] = list(attr_data["requiredFlags"])
-            attr_data["maxLengths"] = list(attr_data["maxLengths"])
+                if data_type not in entry["dataTypes"]:
+                    entry["dataTypes"].append(data_type)
+                if required not in entry["requiredFlags"]:
+                    entry["requiredFlags"].append(required)
+                if max_length and max_length not in entry["maxLengths"]:
+                    entry["maxLengths"].append(max_length)
         
         return {
             "canonicalAttributes": canonical_attributes,
@@ -1519,10 +1860,10 @@ def main():
     # Try to load from SchemaOps config file if env vars not set
     if not all([amazon_client_id, amazon_client_secret, amazon_refresh_token]):
         # First try SchemaOps config directory
-        config_path = Path(__file__).parent.parent / "config" / "amazon_sp_api.json"
+        config_path = CONFIG_DIR / "amazon_sp_api.json"
         if not config_path.exists():
             # Fallback to amazon_sp_api_integration directory
-            config_path = Path(__file__).parent.parent.parent / "amazon_sp_api_integration" / "config.json"
+            config_path = PROJECT_DIR.parent / "amazon_sp_api_integration" / "config.json"
         
         if config_path.exists():
             try:
@@ -1551,7 +1892,7 @@ def main():
     
     # Try to load from SchemaOps config file if env var not set
     if not mirakl_api_key:
-        config_path = Path(__file__).parent.parent / "config" / "mirakl_api.json"
+        config_path = CONFIG_DIR / "mirakl_api.json"
         if config_path.exists():
             try:
                 with open(config_path, 'r') as f:
@@ -1587,20 +1928,18 @@ def main():
     canonical_mapping = extractor.generate_canonical_mapping()
     
     # Save results
-    output_dir = Path(__file__).parent.parent / "20_QA"
+    output_dir = PROJECT_DIR / "20_QA"
     output_dir.mkdir(exist_ok=True)
     
     # Save individual schemas
     for mp_name, schema in schemas.items():
         output_file = output_dir / f"{mp_name}_schema.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(schema, f, ensure_ascii=False, indent=2)
+        _write_json_file(output_file, schema)
         logger.info(f"Saved {mp_name} schema to {output_file}")
     
     # Save canonical mapping
     canonical_file = output_dir / "canonical_mapping.json"
-    with open(canonical_file, 'w', encoding='utf-8') as f:
-        json.dump(canonical_mapping, f, ensure_ascii=False, indent=2)
+    _write_json_file(canonical_file, canonical_mapping)
     logger.info(f"Saved canonical mapping to {canonical_file}")
     
     # Print summary
@@ -1616,5 +1955,4 @@ def main():
             print(f"- {mp_name}: ERROR - {schema['error']}")
 
 if __name__ == "__main__":
-    from pathlib import Path
     main()